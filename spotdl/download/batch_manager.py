@@ -7,27 +7,50 @@ from too many concurrent requests.
 """
 
 import asyncio
+import heapq
+import inspect
+import itertools
 import logging
-from typing import Callable, Dict, Optional, Tuple
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
 from pathlib import Path
-from dataclasses import dataclass, field
-from enum import Enum
+from dataclasses import dataclass
+from enum import IntEnum
 
 from spotdl.types.song import Song
 
-__all__ = ["DownloadStatus", "BatchDownloadManager"]
+__all__ = [
+    "DownloadStatus",
+    "DownloadResult",
+    "NonRetryableError",
+    "BatchDownloadManager",
+]
 
 logger = logging.getLogger(__name__)
 
+# Number of download attempts between concurrency adjustments when auto tuning
+AUTO_TUNE_WINDOW = 10
 
-class DownloadStatus(str, Enum):
-    """Status of a download task."""
+# Share of failed attempts in a window above which concurrency is reduced
+AUTO_TUNE_MAX_FAILURE_RATE = 0.2
 
-    QUEUED = "queued"
-    DOWNLOADING = "downloading"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
+
+class NonRetryableError(Exception):
+    """
+    Raised by a download function when retrying the song can't help.
+    """
+
+
+class DownloadStatus(IntEnum):
+    """Status of a download task, serialized as the lowercase name."""
+
+    QUEUED = 0
+    DOWNLOADING = 1
+    COMPLETED = 2
+    FAILED = 3
+    CANCELLED = 4
 
 
 @dataclass
@@ -40,11 +63,60 @@ class DownloadTask:
     max_retries: int = 3
     error_message: Optional[str] = None
     result_path: Optional[Path] = None
-    created_at: float = field(default_factory=lambda: asyncio.get_event_loop().time())
+    created_at: float = 0.0
     started_at: Optional[float] = None
     completed_at: Optional[float] = None
 
 
+@dataclass(slots=True)
+class DownloadResult:
+    """
+    Final outcome of a download task.
+
+    ### Arguments
+    - status: Lowercase name of the final DownloadStatus, e.g. "completed"
+    - path: Path of the downloaded file, None if the download failed
+    - error_message: Error from the last failed attempt, if any
+    - retries: Number of retries made before the task finished
+    """
+
+    status: str
+    path: Optional[str]
+    error_message: Optional[str]
+    retries: int
+
+
+def _get_retry_after(exception: Optional[BaseException]) -> Optional[float]:
+    """
+    Get the Retry-After delay from an HTTP 429 error, if present.
+
+    ### Arguments
+    - exception: Exception raised by the download function
+
+    ### Returns
+    - Delay in seconds or None if the exception is not a 429 with Retry-After
+    """
+
+    if exception is None:
+        return None
+
+    response = getattr(exception, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exception, "code", None)
+    headers = getattr(response, "headers", None) or getattr(exception, "headers", None)
+
+    if status != 429 or not headers:
+        return None
+
+    retry_after = headers.get("Retry-After")
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return None
+
+
 class BatchDownloadManager:
     """
     Manages downloads in batches to prevent network overload.
@@ -62,6 +134,12 @@ class BatchDownloadManager:
         max_concurrent: int = 3,
         max_retries: int = 3,
         progress_callback=None,
+        max_backoff: float = 60,
+        sync_callback_is_fast: bool = False,
+        auto_tune: bool = False,
+        max_auto_concurrent: int = 32,
+        progress_interval: float = 0.1,
+        max_queue_size: Optional[int] = None,
     ):
         """
         Initialize the batch download manager.
@@ -71,18 +149,70 @@ class BatchDownloadManager:
         - max_concurrent: Maximum concurrent downloads at once
         - max_retries: Maximum retry attempts per song
         - progress_callback: Callback for progress updates (song, status_message)
+        - max_backoff: Upper bound in seconds for the backoff between retries,
+        a longer Retry-After from the server is still honoured
+        - sync_callback_is_fast: Call a sync progress_callback directly on the
+        event loop instead of in a thread, only for non-blocking callbacks
+        - auto_tune: Adjust the number of concurrent downloads based on the
+        observed download rate, starting from max_concurrent
+        - max_auto_concurrent: Upper bound for concurrent downloads when auto tuning
+        - progress_interval: Seconds between batches of progress updates, only the
+        latest update for each song in a batch is sent
+        - max_queue_size: Number of waiting songs above which add_to_queue blocks
+        while the queue is being processed, defaults to max(batch_size * 4, 64)
         """
 
         self.batch_size = batch_size
         self.max_concurrent = max_concurrent
         self.max_retries = max_retries
         self.progress_callback = progress_callback
+        self.max_backoff = max_backoff
+
+        # Capped exponential backoff for every retry count a task can reach
+        self._backoff_table = [min(max_backoff, 2**i) for i in range(max_retries + 2)]
+        self.sync_callback_is_fast = sync_callback_is_fast
+        self._callback_is_async = inspect.iscoroutinefunction(progress_callback)
+        self.auto_tune = auto_tune
+        self.max_auto_concurrent = max_auto_concurrent
+        self.progress_interval = progress_interval
+
+        # Progress updates waiting to be sent, keyed by song URL
+        self._pending_updates: Dict[str, Tuple[Song, str]] = {}
+        self._update_flusher: Optional[asyncio.Task] = None
+
+        # Held while sending updates so a song's updates arrive in order
+        self._flush_lock = asyncio.Lock()
+
+        # Worker pool size and download rate tracking used by auto tuning
+        self._target_workers = max(1, max_concurrent)
+        self._active_workers = 0
+        self._window_attempts = 0
+        self._window_failures = 0
+        self._window_started = 0.0
+        self._rate_ema: Optional[float] = None
 
         # Queue management
-        self.queue: asyncio.Queue = None  # type: ignore
+        self.queue: Deque[DownloadTask] = None  # type: ignore
         self.tasks_map: Dict[str, DownloadTask] = {}
         self.lock = asyncio.Lock()
 
+        # Back-pressure for producers adding songs while workers drain the queue
+        self.max_queue_size = max_queue_size or max(batch_size * 4, 64)
+        self._queue_space = asyncio.Event()
+        self._processing = False
+
+        # Wakes idle workers, who exit on an empty queue once it is finished
+        self._work_available = asyncio.Event()
+        self._queue_finished = True
+
+        # Clock used for task timestamps, replaced by loop.time on initialize
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._now: Callable[[], float] = time.monotonic
+
+        # Number of tasks in each status indexed by DownloadStatus,
+        # kept in sync by _set_status
+        self._status_counts: List[int] = [0] * len(DownloadStatus)
+
         # Stats
         self.total_queued = 0
         self.total_completed = 0
@@ -99,7 +229,11 @@ class BatchDownloadManager:
 
     async def initialize(self):
         """Initialize async components."""
-        self.queue = asyncio.Queue()
+        self.queue = deque()
+
+        # loop.time() is monotonic, so this matches the pre-initialize clock
+        self._loop = asyncio.get_running_loop()
+        self._now = self._loop.time
         logger.debug("BatchDownloadManager queue initialized")
 
     async def add_to_queue(self, song: Song) -> str:
@@ -111,25 +245,43 @@ class BatchDownloadManager:
 
         ### Returns
         - Task ID for tracking
+
+        ### Notes
+        - While the queue is being processed this waits for the workers once
+        max_queue_size songs are waiting, so a producer streaming a huge
+        playlist doesn't get far ahead of the downloads. Such a producer should
+        run process_queue with keep_open=True and call finish_queue when done.
         """
 
+        while self._processing and len(self.queue) >= self.max_queue_size:
+            self._queue_space.clear()
+            await self._queue_space.wait()
+
         task_id = song.url
-        task = DownloadTask(song=song, max_retries=self.max_retries)
+        task = DownloadTask(
+            song=song, max_retries=self.max_retries, created_at=self._now()
+        )
 
         async with self.lock:
-            self.tasks_map[task_id] = task
+            if not self._track_task(task):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Song already queued: %s", song.display_name)
+
+                return task_id
+
             self.total_queued += 1
 
-        await self.queue.put(task_id)
+        self.queue.append(task)
+        self._work_available.set()
 
-        if self.progress_callback:
-            self.progress_callback(song, "Queued for download")
+        self._notify(song, "Queued for download")
 
-        logger.debug(
-            "Added song to queue: %s (Total queued: %d)",
-            song.display_name,
-            self.total_queued,
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Added song to queue: %s (Total queued: %d)",
+                song.display_name,
+                self.total_queued,
+            )
 
         return task_id
 
@@ -144,245 +296,546 @@ class BatchDownloadManager:
         - List of task IDs
         """
 
-        task_ids = []
-        for song in songs:
-            task_id = await self.add_to_queue(song)
-            task_ids.append(task_id)
+        now = self._now()
+        new_tasks = [
+            DownloadTask(song=song, max_retries=self.max_retries, created_at=now)
+            for song in songs
+        ]
+
+        async with self.lock:
+            new_tasks = [task for task in new_tasks if self._track_task(task)]
+            self.total_queued += len(new_tasks)
+
+        self.queue.extend(new_tasks)
+        self._work_available.set()
+
+        for task in new_tasks:
+            self._notify(task.song, "Queued for download")
+
+        logger.info("Added batch of %d songs to queue", len(new_tasks))
+        return [song.url for song in songs]
+
+    def _track_task(self, task: DownloadTask) -> bool:
+        """
+        Add a task to tasks_map unless its song is already queued or downloaded.
+
+        ### Arguments
+        - task: The new task
+
+        ### Returns
+        - True if the task was added and should be queued
+
+        ### Notes
+        - Must be called with the lock held. Failed or cancelled songs can be
+        queued again and replace their previous task.
+        """
+
+        task_id = task.song.url
+        previous = self.tasks_map.get(task_id)
+        if previous is not None:
+            if previous.status not in (
+                DownloadStatus.FAILED,
+                DownloadStatus.CANCELLED,
+            ):
+                return False
 
-        logger.info("Added batch of %d songs to queue", len(songs))
-        return task_ids
+            self._status_counts[previous.status] -= 1
+
+        self.tasks_map[task_id] = task
+        self._status_counts[task.status] += 1
+
+        return True
 
     async def get_task_status(self, task_id: str) -> Optional[DownloadTask]:
         """Get the current status of a download task."""
-        async with self.lock:
-            return self.tasks_map.get(task_id)
+        return self.tasks_map.get(task_id)
 
     async def get_queue_stats(self) -> Dict[str, int]:
         """Get statistics about the download queue."""
-        async with self.lock:
-            queued = sum(
-                1 for t in self.tasks_map.values() if t.status == DownloadStatus.QUEUED
-            )
-            downloading = sum(
-                1
-                for t in self.tasks_map.values()
-                if t.status == DownloadStatus.DOWNLOADING
-            )
-            completed = sum(
-                1
-                for t in self.tasks_map.values()
-                if t.status == DownloadStatus.COMPLETED
-            )
-            failed = sum(
-                1 for t in self.tasks_map.values() if t.status == DownloadStatus.FAILED
+        stats = {
+            status.name.lower(): self._status_counts[status]
+            for status in DownloadStatus
+        }
+        stats["total"] = len(self.tasks_map)
+
+        return stats
+
+    def _notify(self, song: Song, message: str):
+        """
+        Queue a progress update for the progress callback, if any.
+
+        ### Arguments
+        - song: The song the update is about
+        - message: The status message
+
+        ### Notes
+        - Updates are sent every progress_interval seconds and a newer update
+        for a song replaces one that hasn't been sent yet.
+        """
+
+        if self.progress_callback is None:
+            return
+
+        self._pending_updates[song.url] = (song, message)
+        if self._update_flusher is None or self._update_flusher.done():
+            self._update_flusher = asyncio.create_task(self._flush_updates_loop())
+
+    async def _flush_updates_loop(self):
+        """Send pending progress updates periodically until none are left."""
+        while self._pending_updates:
+            await asyncio.sleep(self.progress_interval)
+
+            # Cancelling the loop mustn't drop updates taken for sending
+            await asyncio.shield(self._flush_updates())
+
+    async def _flush_updates(self):
+        """
+        Send all pending progress updates to the progress callback.
+
+        ### Notes
+        - Sync callbacks run in the default executor so a slow callback
+        doesn't stall the other downloads, unless sync_callback_is_fast is set.
+        - Only one flush runs at a time, otherwise a newer update could be sent
+        while an older one for the same song is still in the callback.
+        """
+
+        async with self._flush_lock:
+            updates = self._pending_updates
+            self._pending_updates = {}
+
+            for song, message in updates.values():
+                try:
+                    if self._callback_is_async:
+                        await self.progress_callback(song, message)  # type: ignore
+                    elif self.sync_callback_is_fast or self._loop is None:
+                        self.progress_callback(song, message)  # type: ignore
+                    else:
+                        await self._loop.run_in_executor(
+                            None, self.progress_callback, song, message
+                        )
+                except Exception:
+                    logger.exception(
+                        "Progress callback failed for %s", song.display_name
+                    )
+
+    def _set_status(self, task: DownloadTask, status: DownloadStatus):
+        """
+        Move a task to a new status and update the status counts.
+
+        ### Arguments
+        - task: The task to update
+        - status: The new status of the task
+        """
+
+        self._status_counts[task.status] -= 1
+        self._status_counts[status] += 1
+        task.status = status
+
+    def _tune_concurrency(self, failed: bool) -> int:
+        """
+        Record a download attempt and adjust the target number of workers.
+
+        ### Arguments
+        - failed: Whether the attempt failed
+
+        ### Returns
+        - Change in the target number of workers (-1, 0 or 1)
+
+        ### Notes
+        - Every window of at least AUTO_TUNE_WINDOW attempts, the rate of
+        successful downloads is folded into a moving average. A worker is added
+        while the average improves and removed once it drops or too many
+        attempts fail.
+        """
+
+        self._window_attempts += 1
+        self._window_failures += failed
+        # Measure over a few rounds of the whole pool to smooth out bursts
+        if self._window_attempts < max(AUTO_TUNE_WINDOW, self._target_workers * 3):
+            return 0
+
+        now = self._now()
+        elapsed = max(now - self._window_started, 1e-6)
+        successes = self._window_attempts - self._window_failures
+        rate = successes / elapsed
+        failure_rate = self._window_failures / self._window_attempts
+
+        previous_ema = self._rate_ema
+        self._rate_ema = rate if previous_ema is None else (previous_ema + rate) / 2
+
+        self._window_attempts = 0
+        self._window_failures = 0
+        self._window_started = now
+
+        # Small drops are treated as noise so the pool doesn't flap
+        delta = 0
+        if failure_rate > AUTO_TUNE_MAX_FAILURE_RATE or (
+            previous_ema is not None and self._rate_ema < previous_ema * 0.9
+        ):
+            delta = -1 if self._target_workers > 1 else 0
+        elif previous_ema is None or self._rate_ema > previous_ema:
+            delta = 1 if self._target_workers < self.max_auto_concurrent else 0
+
+        if delta:
+            self._target_workers += delta
+            logger.info(
+                "Adjusted concurrent downloads to %d (%.2f songs/s, %.0f%% failed)",
+                self._target_workers,
+                self._rate_ema,
+                failure_rate * 100,
             )
 
-            return {
-                "queued": queued,
-                "downloading": downloading,
-                "completed": completed,
-                "failed": failed,
-                "total": len(self.tasks_map),
-            }
+        return delta
+
+    def _get_backoff(
+        self, retry_count: int, exception: Optional[BaseException] = None
+    ) -> float:
+        """
+        Get the delay before the next retry attempt.
+
+        ### Arguments
+        - retry_count: Number of retries done so far for the task
+        - exception: Exception raised by the failed attempt, if any
+
+        ### Returns
+        - Delay in seconds, between half and all of the capped exponential
+        backoff, and at least the server's Retry-After for HTTP 429 responses
+
+        ### Notes
+        - Jitter keeps concurrent workers that failed together
+        from retrying in lockstep and hitting the rate limit again.
+        - Retry-After isn't capped by max_backoff, retrying any sooner
+        would only hit the rate limit again and waste a retry.
+        """
+
+        backoff = self._backoff_table[retry_count] * (0.5 + random.random() / 2)
+
+        retry_after = _get_retry_after(exception)
+        if retry_after is not None:
+            return max(backoff, retry_after)
+
+        return backoff
+
+    async def finish_queue(self):
+        """
+        Signal that no more songs will be added while the queue is processed.
+
+        ### Notes
+        - Only needed when process_queue was started with keep_open=True,
+        the workers then exit once the queue and pending retries are empty.
+        """
+
+        self._queue_finished = True
+        self._work_available.set()
 
     async def process_queue(
         self,
         download_func,
-    ) -> Dict[str, Dict]:
+        keep_open: bool = False,
+    ) -> AsyncIterator[Tuple[str, DownloadResult]]:
         """
         Process the download queue with batching and retry logic.
 
         ### Arguments
         - download_func: Async function that downloads a song, returns (success, path, error_msg)
+        - keep_open: Wait for songs added while processing until finish_queue
+        is called, instead of stopping as soon as the queue is empty
 
         ### Returns
-        - Dictionary of task_id -> {status, path, error_message, retries}
+        - Async iterator of (task_id, DownloadResult) pairs, yielded as soon as
+        each task has completed or failed for good
+
+        ### Notes
+        - Downloads stop if the caller stops iterating early.
         """
 
         if self.queue is None:
             await self.initialize()
 
-        results = {}
-        semaphore = asyncio.Semaphore(self.max_concurrent)
+        # Finished results, followed by None once every worker has exited
+        results: "asyncio.Queue[Optional[Tuple[str, DownloadResult]]]" = asyncio.Queue()
 
-        async def download_with_retry(task_id: str):
-            """Download a single task with retry logic."""
-            task = self.tasks_map[task_id]
+        # Checked once so per attempt debug logs cost nothing when disabled
+        debug = logger.isEnabledFor(logging.DEBUG)
 
-            async with semaphore:
-                while task.retry_count <= task.max_retries:
-                    try:
-                        async with self.lock:
-                            task.status = DownloadStatus.DOWNLOADING
-                            task.started_at = asyncio.get_event_loop().time()
+        # Heap of (retry_at, sequence, task) for tasks waiting to be retried
+        retries: List[Tuple[float, int, DownloadTask]] = []
+        sequence = itertools.count()
 
-                        if self.progress_callback:
-                            self.progress_callback(task.song, "Downloading...")
+        async def download_attempt(task: DownloadTask) -> Optional[float]:
+            """
+            Make a single download attempt for a task.
 
-                        logger.debug(
-                            "Downloading: %s (attempt %d)",
-                            task.song.display_name,
-                            task.retry_count + 1,
+            Returns the delay before the task should be retried,
+            or None once the task has completed or failed for good.
+            """
+
+            # Task fields are only mutated by one worker at a time and the stat
+            # counters are plain ints, so no lock is needed on the event loop.
+            name = task.song.display_name
+            try:
+                self._set_status(task, DownloadStatus.DOWNLOADING)
+                task.started_at = self._now()
+
+                self._notify(task.song, "Downloading...")
+
+                if debug:
+                    logger.debug(
+                        "Downloading: %s (attempt %d)", name, task.retry_count + 1
+                    )
+
+                # Call the download function (should be async)
+                success, path, error_msg = await download_func(task.song)
+
+                if success:
+                    self._set_status(task, DownloadStatus.COMPLETED)
+                    task.result_path = path
+                    task.completed_at = self._now()
+                    self.total_completed += 1
+
+                    self._notify(task.song, "Downloaded successfully")
+
+                    logger.info(
+                        "Successfully downloaded: %s",
+                        name,
+                    )
+                else:
+                    # Retry if we haven't exceeded max retries
+                    if task.retry_count < task.max_retries:
+                        task.retry_count += 1
+                        self.total_retried += 1
+                        task.error_message = error_msg
+                        self._set_status(task, DownloadStatus.QUEUED)
+
+                        # Exponential backoff
+                        backoff = self._get_backoff(task.retry_count)
+                        self._notify(
+                            task.song,
+                            f"Retry {task.retry_count}/{task.max_retries} in {backoff:.1f}s: {error_msg}",
+                        )
+
+                        logger.warning(
+                            "Download failed for %s, retrying (%d/%d): %s",
+                            name,
+                            task.retry_count,
+                            task.max_retries,
+                            error_msg,
                         )
 
-                        # Call the download function (should be async)
-                        success, path, error_msg = await download_func(task.song)
-
-                        async with self.lock:
-                            if success:
-                                task.status = DownloadStatus.COMPLETED
-                                task.result_path = path
-                                task.completed_at = asyncio.get_event_loop().time()
-                                self.total_completed += 1
-
-                                if self.progress_callback:
-                                    self.progress_callback(
-                                        task.song, "Downloaded successfully"
-                                    )
-
-                                logger.info(
-                                    "Successfully downloaded: %s",
-                                    task.song.display_name,
-                                )
-                            else:
-                                # Retry if we haven't exceeded max retries
-                                if task.retry_count < task.max_retries:
-                                    task.retry_count += 1
-                                    self.total_retried += 1
-                                    task.error_message = error_msg
-                                    task.status = DownloadStatus.QUEUED
-
-                                    # Exponential backoff
-                                    backoff = 2**task.retry_count
-                                    if self.progress_callback:
-                                        self.progress_callback(
-                                            task.song,
-                                            f"Retry {task.retry_count}/{task.max_retries} in {backoff}s: {error_msg}",
-                                        )
-
-                                    logger.warning(
-                                        "Download failed for %s, retrying (%d/%d): %s",
-                                        task.song.display_name,
-                                        task.retry_count,
-                                        task.max_retries,
-                                        error_msg,
-                                    )
-
-                                    await asyncio.sleep(backoff)
-                                    continue
-                                else:
-                                    task.status = DownloadStatus.FAILED
-                                    task.error_message = error_msg
-                                    task.completed_at = asyncio.get_event_loop().time()
-                                    self.total_failed += 1
-
-                                    if self.progress_callback:
-                                        self.progress_callback(
-                                            task.song,
-                                            f"Failed after {task.max_retries} retries: {error_msg}",
-                                        )
-
-                                    logger.error(
-                                        "Failed to download %s after %d retries: %s",
-                                        task.song.display_name,
-                                        task.max_retries,
-                                        error_msg,
-                                    )
+                        return backoff
+
+                    self._set_status(task, DownloadStatus.FAILED)
+                    task.error_message = error_msg
+                    task.completed_at = self._now()
+                    self.total_failed += 1
+
+                    self._notify(
+                        task.song,
+                        f"Failed after {task.retry_count} retries: {error_msg}",
+                    )
+
+                    logger.error(
+                        "Failed to download %s after %d retries: %s",
+                        name,
+                        task.retry_count,
+                        error_msg,
+                    )
+
+            except Exception as e:
+                error_str = str(e)
+                logger.exception(
+                    "Exception during download of %s: %s",
+                    name,
+                    error_str,
+                )
+
+                # NonRetryableError marks a permanent failure, e.g. no match found
+                if task.retry_count < task.max_retries and not isinstance(
+                    e, NonRetryableError
+                ):
+                    task.retry_count += 1
+                    self.total_retried += 1
+                    task.error_message = error_str
+                    self._set_status(task, DownloadStatus.QUEUED)
+
+                    backoff = self._get_backoff(task.retry_count, e)
+                    self._notify(
+                        task.song,
+                        f"Retry {task.retry_count}/{task.max_retries} in {backoff:.1f}s: {error_str}",
+                    )
+
+                    return backoff
+
+                self._set_status(task, DownloadStatus.FAILED)
+                task.error_message = error_str
+                task.completed_at = self._now()
+                self.total_failed += 1
+
+                self._notify(
+                    task.song,
+                    f"Failed: {error_str}",
+                )
+
+            # Record result
+            result = DownloadResult(
+                status=task.status.name.lower(),
+                path=str(task.result_path) if task.result_path else None,
+                error_message=task.error_message,
+                retries=task.retry_count,
+            )
+            results.put_nowait((task.song.url, result))
+
+            return None
+
+        async def worker():
+            """
+            Download tasks one at a time until the queue is finished and empty.
+
+            Failed tasks are scheduled for a later retry instead of sleeping
+            here, so the worker keeps downloading other songs meanwhile.
+            """
 
+            try:
+                # Extra workers exit when auto tuning lowers the target
+                while self._active_workers <= self._target_workers:
+                    if self.queue:
+                        task = self.queue.popleft()
+                        if len(self.queue) < self.max_queue_size:
+                            self._queue_space.set()
+                    elif retries and retries[0][0] <= self._now():
+                        task = heapq.heappop(retries)[2]
+                    elif retries or not self._queue_finished:
+                        # Wait for a new song or the next retry to become due
+                        self._work_available.clear()
+                        timeout = retries[0][0] - self._now() if retries else None
+                        try:
+                            await asyncio.wait_for(self._work_available.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            pass
+
+                        continue
+                    else:
                         break
 
-                    except Exception as e:
-                        error_str = str(e)
-                        logger.exception(
-                            "Exception during download of %s: %s",
-                            task.song.display_name,
-                            error_str,
+                    try:
+                        backoff = await download_attempt(task)
+                    except asyncio.CancelledError:
+                        # Put the song back so a later run picks it up again
+                        self._set_status(task, DownloadStatus.QUEUED)
+                        self.queue.appendleft(task)
+                        raise
+
+                    if backoff is not None:
+                        heapq.heappush(
+                            retries, (self._now() + backoff, next(sequence), task)
                         )
 
-                        async with self.lock:
-                            if task.retry_count < task.max_retries:
-                                task.retry_count += 1
-                                self.total_retried += 1
-                                task.error_message = error_str
-                                task.status = DownloadStatus.QUEUED
-
-                                backoff = 2**task.retry_count
-                                if self.progress_callback:
-                                    self.progress_callback(
-                                        task.song,
-                                        f"Retry {task.retry_count}/{task.max_retries} in {backoff}s: {error_str}",
-                                    )
-
-                                await asyncio.sleep(backoff)
-                                continue
-                            else:
-                                task.status = DownloadStatus.FAILED
-                                task.error_message = error_str
-                                task.completed_at = asyncio.get_event_loop().time()
-                                self.total_failed += 1
-
-                                if self.progress_callback:
-                                    self.progress_callback(
-                                        task.song,
-                                        f"Failed: {error_str}",
-                                    )
+                        # Idle workers recompute how long to wait
+                        self._work_available.set()
 
-                        break
+                    if self.auto_tune:
+                        failed = task.status != DownloadStatus.COMPLETED
+                        if self._tune_concurrency(failed) > 0:
+                            spawn_worker()
+            finally:
+                self._active_workers -= 1
 
-                # Record result
-                async with self.lock:
-                    results[task_id] = {
-                        "status": task.status.value,
-                        "path": str(task.result_path) if task.result_path else None,
-                        "error_message": task.error_message,
-                        "retries": task.retry_count,
-                    }
-
-        # Process all queued tasks
-        workers = []
-        while True:
-            try:
-                task_id = self.queue.get_nowait()
-                worker = asyncio.create_task(download_with_retry(task_id))
-                workers.append(worker)
-            except asyncio.QueueEmpty:
-                break
+        def spawn_worker():
+            """Start a new worker and keep track of it."""
+            self._active_workers += 1
+            workers.append(asyncio.create_task(worker()))
 
-        if workers:
-            await asyncio.gather(*workers)
+        async def run_workers():
+            """Run the worker pool until the queue and retries are empty."""
+            for _ in range(self._target_workers):
+                spawn_worker()
 
-        logger.info(
-            "Queue processing complete - Completed: %d, Failed: %d, Retried: %d",
-            self.total_completed,
-            self.total_failed,
-            self.total_retried,
-        )
+            try:
+                # Workers can be added while waiting when auto tuning
+                while workers:
+                    await workers[0]
+                    workers.pop(0)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+                # Let cancelled workers put their songs back on the queue
+                await asyncio.gather(*workers, return_exceptions=True)
+
+                # Only left over when stopped early, keep them for the next run
+                self.queue.extend(entry[2] for entry in sorted(retries))
+                retries.clear()
+
+                results.put_nowait(None)
+
+            # Send the final status of the last songs without waiting for the flusher,
+            # after any update the flusher is still sending
+            if self._update_flusher is not None:
+                self._update_flusher.cancel()
+
+            await self._flush_updates()
+
+            logger.info(
+                "Queue processing complete - Completed: %d, Failed: %d, Retried: %d",
+                self.total_completed,
+                self.total_failed,
+                self.total_retried,
+            )
 
-        return results
+        # The worker pool bounds concurrency, so only the target
+        # number of downloads are ever in flight at once
+        workers: List[asyncio.Task] = []
+        self._target_workers = max(1, self.max_concurrent)
+        self._window_attempts = 0
+        self._window_failures = 0
+        self._window_started = self._now()
+        self._rate_ema = None
+        self._queue_finished = not keep_open
+
+        # Set before the runner starts so producers are throttled right away
+        self._processing = True
+        runner = asyncio.create_task(run_workers())
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+
+                yield item
+
+            # Raise any error from the workers
+            await runner
+        finally:
+            if not runner.done():
+                runner.cancel()
+                await asyncio.gather(runner, return_exceptions=True)
+
+            # Nothing drains the queue anymore, so stop holding back producers
+            self._processing = False
+            self._queue_space.set()
 
     async def clear_queue(self):
         """Clear all pending tasks from the queue."""
         if self.queue is None:
             return
 
-        while not self.queue.empty():
-            try:
-                self.queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        # Cancelled tasks can be queued again, see _track_task
+        while self.queue:
+            self._set_status(self.queue.popleft(), DownloadStatus.CANCELLED)
+
+        # Wake producers waiting in add_to_queue for space
+        self._queue_space.set()
 
         logger.info("Queue cleared")
 
     async def get_all_tasks(self) -> Dict[str, DownloadTask]:
         """Get all tasks with their current status."""
-        async with self.lock:
-            return self.tasks_map.copy()
+        return self.tasks_map.copy()
 
     async def reset_stats(self):
         """Reset statistics counters."""
-        async with self.lock:
-            self.total_queued = 0
-            self.total_completed = 0
-            self.total_failed = 0
-            self.total_retried = 0
+        self.total_queued = 0
+        self.total_completed = 0
+        self.total_failed = 0
+        self.total_retried = 0
         logger.debug("Statistics reset")
@@ -550,21 +550,21 @@ async def queue_batch_download(
     """
 
     try:
-        if not client.batch_manager.queue:
+        if client.batch_manager.queue is None:
             await client.batch_manager.initialize()
 
-        task_ids = []
+        songs = []
         failed_urls = []
 
         for url in urls:
             try:
-                song = Song.from_url(url)
-                task_id = await client.batch_manager.add_to_queue(song)
-                task_ids.append(task_id)
+                songs.append(Song.from_url(url))
             except Exception as e:
                 state.logger.warning(f"Failed to queue song from {url}: {e}")
                 failed_urls.append({"url": url, "error": str(e)})
 
+        task_ids = await client.batch_manager.add_batch(songs)
+
         stats = await client.batch_manager.get_queue_stats()
 
         return {
@@ -600,7 +600,7 @@ async def process_batch_download(
     """
 
     try:
-        if not client.batch_manager.queue:
+        if client.batch_manager.queue is None:
             await client.batch_manager.initialize()
 
         # Set up output directory
@@ -627,7 +627,12 @@ async def process_batch_download(
                 return False, None, str(e)
 
         # Process the queue with batching
-        results = await client.batch_manager.process_queue(download_song_wrapper)
+        results = {
+            task_id: result
+            async for task_id, result in client.batch_manager.process_queue(
+                download_song_wrapper
+            )
+        }
 
         stats = await client.batch_manager.get_queue_stats()
 
@@ -657,7 +662,7 @@ async def get_batch_status(
     - returns dict with queue stats and task statuses
     """
 
-    if not client.batch_manager.queue:
+    if client.batch_manager.queue is None:
         await client.batch_manager.initialize()
 
     stats = await client.batch_manager.get_queue_stats()
@@ -667,7 +672,7 @@ async def get_batch_status(
     tasks_data = {
         task_id: {
             "song": task.song.json,
-            "status": task.status.value,
+            "status": task.status.name.lower(),
             "retry_count": task.retry_count,
             "error_message": task.error_message,
             "created_at": task.created_at,
@@ -0,0 +1,598 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from spotdl.download.batch_manager import (
+    BatchDownloadManager,
+    NonRetryableError,
+    _get_retry_after,
+)
+from spotdl.types.song import Song
+
+
+def make_song(name: str) -> Song:
+    """
+    Create a song with placeholder metadata.
+    """
+
+    return Song(
+        name=name,
+        artists=["test"],
+        album_id="test",
+        album_name="test",
+        album_artist="test",
+        album_type="test",
+        genres=["test"],
+        disc_number=1,
+        duration=1,
+        year=1,
+        date="test",
+        track_number=1,
+        tracks_count=1,
+        isrc="test",
+        song_id=name,
+        cover_url="test",
+        explicit=False,
+        download_url="test",
+        artist="test",
+        copyright_text="test",
+        disc_count=1,
+        publisher="test",
+        url=f"https://open.spotify.com/track/{name}",
+        popularity=1,
+    )
+
+
+class FakeDownloader:
+    """
+    Download function that records attempts and fails on demand.
+    """
+
+    def __init__(self, delay: float = 0.001, failures=None):
+        self.delay = delay
+        self.failures = failures or {}
+        self.attempts = {}
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, song: Song):
+        self.attempts[song.name] = self.attempts.get(song.name, 0) + 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        failure = self.failures.get(song.name)
+        if isinstance(failure, BaseException):
+            raise failure
+
+        if failure is not None:
+            return False, None, failure
+
+        return True, f"/music/{song.name}.mp3", None
+
+
+class FakeResponse:
+    """
+    Response with a status code and headers, like the ones on HTTP errors.
+    """
+
+    def __init__(self, status_code: int, headers: dict):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeHTTPError(Exception):
+    """
+    Error carrying an HTTP response.
+    """
+
+    def __init__(self, status_code: int, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code, headers or {})
+
+
+async def make_manager(**kwargs) -> BatchDownloadManager:
+    """
+    Create an initialized manager with near instant retries.
+    """
+
+    kwargs.setdefault("max_backoff", 0.001)
+    manager = BatchDownloadManager(**kwargs)
+    await manager.initialize()
+
+    return manager
+
+
+async def collect(manager: BatchDownloadManager, download_func, **kwargs):
+    """
+    Run process_queue to completion and return the results by song name.
+    """
+
+    return {
+        manager.tasks_map[task_id].song.name: result
+        async for task_id, result in manager.process_queue(download_func, **kwargs)
+    }
+
+
+@pytest.mark.parametrize("name", ["Connection", "500 Miles", "Plain Song"])
+async def test_failed_downloads_are_retried(name):
+    """
+    Failed downloads use the whole retry budget, whatever the song is called.
+    """
+
+    manager = await make_manager(max_retries=3)
+    downloader = FakeDownloader(failures={name: f"Failed to download {name}"})
+    await manager.add_to_queue(make_song(name))
+
+    results = await collect(manager, downloader)
+
+    assert downloader.attempts[name] == 4
+    assert results[name].status == "failed"
+    assert results[name].retries == 3
+    assert manager.total_retried == 3
+
+
+async def test_exceptions_are_retried():
+    """
+    Exceptions raised by the download function are retried.
+    """
+
+    manager = await make_manager(max_retries=2)
+    downloader = FakeDownloader(failures={"song": RuntimeError("oops")})
+    await manager.add_to_queue(make_song("song"))
+
+    results = await collect(manager, downloader)
+
+    assert downloader.attempts["song"] == 3
+    assert results["song"].status == "failed"
+    assert results["song"].error_message == "oops"
+
+
+async def test_non_retryable_error_fails_fast():
+    """
+    NonRetryableError fails the song without any retries.
+    """
+
+    manager = await make_manager(max_retries=3)
+    downloader = FakeDownloader(failures={"gone": NonRetryableError("No match")})
+    await manager.add_batch([make_song("gone"), make_song("ok")])
+
+    results = await collect(manager, downloader)
+
+    assert downloader.attempts == {"gone": 1, "ok": 1}
+    assert results["gone"].status == "failed"
+    assert results["gone"].retries == 0
+    assert results["ok"].status == "completed"
+    assert results["ok"].path == "/music/ok.mp3"
+
+
+async def test_duplicate_songs_are_downloaded_once():
+    """
+    A song added again while it is queued is only downloaded once.
+    """
+
+    manager = await make_manager()
+    downloader = FakeDownloader()
+    await manager.add_to_queue(make_song("song"))
+    await manager.add_to_queue(make_song("song"))
+    await manager.add_batch([make_song("song"), make_song("other")])
+
+    assert len(manager.queue) == 2
+
+    results = await collect(manager, downloader)
+
+    assert downloader.attempts == {"song": 1, "other": 1}
+    assert set(results) == {"song", "other"}
+
+    # Completed songs aren't downloaded again either
+    await manager.add_to_queue(make_song("song"))
+    assert len(manager.queue) == 0
+
+
+async def test_failed_song_can_be_added_again():
+    """
+    A song that failed can be queued and downloaded again.
+    """
+
+    manager = await make_manager(max_retries=0)
+    downloader = FakeDownloader(failures={"song": "error"})
+    await manager.add_to_queue(make_song("song"))
+    results = await collect(manager, downloader)
+
+    assert results["song"].status == "failed"
+
+    downloader.failures.clear()
+    await manager.add_to_queue(make_song("song"))
+    results = await collect(manager, downloader)
+
+    assert results["song"].status == "completed"
+    assert downloader.attempts["song"] == 2
+
+
+async def test_cleared_song_can_be_added_again():
+    """
+    Clearing the queue cancels its songs, which can then be queued again.
+    """
+
+    manager = await make_manager()
+    downloader = FakeDownloader()
+    await manager.add_to_queue(make_song("song"))
+    await manager.clear_queue()
+
+    stats = await manager.get_queue_stats()
+    assert stats["queued"] == 0
+    assert stats["cancelled"] == 1
+
+    await manager.add_to_queue(make_song("song"))
+    assert len(manager.queue) == 1
+
+    results = await collect(manager, downloader)
+
+    assert results["song"].status == "completed"
+    assert (await manager.get_queue_stats())["completed"] == 1
+
+
+async def test_results_are_streamed():
+    """
+    Results are yielded while other songs are still downloading.
+    """
+
+    manager = await make_manager(max_concurrent=1)
+    downloader = FakeDownloader()
+    await manager.add_batch([make_song(f"song{i}") for i in range(3)])
+
+    started = []
+    async for _, result in manager.process_queue(downloader):
+        assert result.status == "completed"
+        started.append(sum(downloader.attempts.values()))
+
+    # The first result arrives before the last song has been started
+    assert started[0] < 3
+    assert len(started) == 3
+
+
+async def test_stopping_early_requeues_songs():
+    """
+    Songs in flight when the caller stops iterating go back on the queue.
+    """
+
+    manager = await make_manager(max_concurrent=2)
+    downloader = FakeDownloader(delay=0.01)
+    await manager.add_batch([make_song(f"song{i}") for i in range(10)])
+
+    results = manager.process_queue(downloader)
+    async for _ in results:
+        break
+
+    await results.aclose()
+
+    stats = await manager.get_queue_stats()
+    assert stats["downloading"] == 0
+    assert stats["queued"] + stats["completed"] == 10
+    assert len(manager.queue) == stats["queued"]
+
+    # A later run downloads the rest
+    remaining = await collect(manager, downloader)
+    assert len(remaining) == stats["queued"]
+    assert (await manager.get_queue_stats())["completed"] == 10
+
+
+async def test_auto_tune_grows_up_to_limit():
+    """
+    Auto tuning adds workers while throughput improves, up to the limit.
+    """
+
+    manager = await make_manager(
+        max_concurrent=1, auto_tune=True, max_auto_concurrent=4
+    )
+    downloader = FakeDownloader(delay=0.005)
+    await manager.add_batch([make_song(f"song{i}") for i in range(200)])
+
+    results = await collect(manager, downloader)
+
+    assert len(results) == 200
+    assert 1 < downloader.peak <= 4
+    assert 1 <= manager._target_workers <= 4
+
+
+async def test_auto_tune_shrinks_on_failures():
+    """
+    Auto tuning removes workers when downloads fail, keeping at least one.
+    """
+
+    manager = await make_manager(
+        max_concurrent=3, max_retries=1, auto_tune=True, max_auto_concurrent=4
+    )
+    failures = {f"song{i}": "error" for i in range(100)}
+    downloader = FakeDownloader(failures=failures)
+    await manager.add_batch([make_song(f"song{i}") for i in range(100)])
+
+    results = await collect(manager, downloader)
+
+    assert len(results) == 100
+    assert downloader.peak <= 4
+    assert manager._target_workers == 1
+
+
+async def test_add_to_queue_blocks_at_max_queue_size():
+    """
+    Producers wait for the workers once max_queue_size songs are queued.
+    """
+
+    manager = await make_manager(max_concurrent=2, max_queue_size=4)
+    downloader = FakeDownloader(delay=0.005)
+    queue_sizes = []
+
+    async def producer():
+        await asyncio.sleep(0)
+        for i in range(40):
+            await manager.add_to_queue(make_song(f"song{i}"))
+            queue_sizes.append(len(manager.queue))
+
+        await manager.finish_queue()
+
+    _, results = await asyncio.gather(
+        producer(), collect(manager, downloader, keep_open=True)
+    )
+
+    assert len(results) == 40
+    assert max(queue_sizes) <= 4
+
+
+async def test_keep_open_waits_for_slow_producer():
+    """
+    With keep_open, songs added after the queue ran dry are still downloaded.
+    """
+
+    manager = await make_manager(max_concurrent=2)
+    downloader = FakeDownloader(delay=0.001)
+
+    async def producer():
+        for i in range(10):
+            await manager.add_to_queue(make_song(f"song{i}"))
+            await asyncio.sleep(0.01)
+
+        await manager.finish_queue()
+
+    _, results = await asyncio.gather(
+        producer(), collect(manager, downloader, keep_open=True)
+    )
+
+    assert len(results) == 10
+    assert len(manager.queue) == 0
+
+
+async def test_progress_updates_are_coalesced():
+    """
+    Only the latest pending update for a song is sent and it ends with the result.
+    """
+
+    updates = []
+    manager = await make_manager(
+        max_concurrent=4,
+        progress_callback=lambda song, message: updates.append((song.name, message)),
+        progress_interval=60,
+    )
+    await manager.add_batch([make_song(f"song{i}") for i in range(4)])
+
+    await collect(manager, FakeDownloader())
+
+    # Every update was still pending when the final flush ran
+    assert sorted(updates) == [
+        (f"song{i}", "Downloaded successfully") for i in range(4)
+    ]
+
+
+async def test_final_progress_update_arrives_last():
+    """
+    The final flush waits for a slow callback still sending an older update.
+    """
+
+    updates = []
+
+    def callback(song, message):
+        if message == "Downloading...":
+            time.sleep(0.15)
+
+        updates.append(message)
+
+    manager = await make_manager(progress_callback=callback, progress_interval=0.01)
+    await manager.add_to_queue(make_song("song"))
+
+    await collect(manager, FakeDownloader(delay=0.05))
+
+    assert updates == ["Downloading...", "Downloaded successfully"]
+
+
+async def test_clear_queue_wakes_blocked_producer():
+    """
+    Clearing a full queue lets a producer waiting for space continue.
+    """
+
+    manager = await make_manager(max_concurrent=1, max_queue_size=2)
+    release = asyncio.Event()
+    downloader = FakeDownloader()
+
+    async def download(song):
+        await release.wait()
+        return await downloader(song)
+
+    async def producer():
+        for i in range(5):
+            await manager.add_to_queue(make_song(f"song{i}"))
+
+        await manager.finish_queue()
+
+    processing = asyncio.create_task(collect(manager, download, keep_open=True))
+    producing = asyncio.create_task(producer())
+
+    # The worker holds song0 while song1 and song2 fill the queue
+    while len(manager.queue) < 2:
+        await asyncio.sleep(0.001)
+
+    await asyncio.sleep(0.01)
+    assert not producing.done()
+
+    await manager.clear_queue()
+    await asyncio.wait_for(producing, 1)
+
+    release.set()
+    results = await asyncio.wait_for(processing, 1)
+
+    assert set(results) == {"song0", "song3", "song4"}
+
+
+async def test_async_progress_callback_is_awaited():
+    """
+    A coroutine progress callback is awaited on the event loop.
+    """
+
+    updates = []
+
+    async def callback(song, message):
+        await asyncio.sleep(0)
+        updates.append((message, threading.get_ident()))
+
+    manager = await make_manager(progress_callback=callback)
+    await manager.add_to_queue(make_song("song"))
+
+    await collect(manager, FakeDownloader())
+
+    assert updates[-1] == ("Downloaded successfully", threading.get_ident())
+
+
+async def test_slow_sync_progress_callback_runs_in_executor():
+    """
+    A slow sync progress callback runs in a thread and doesn't hold up downloads.
+    """
+
+    threads = set()
+    callback_ended = []
+
+    def callback(song, message):
+        threads.add(threading.get_ident())
+        if not callback_ended:
+            time.sleep(0.2)
+            callback_ended.append(time.monotonic())
+
+    finished = []
+    downloader = FakeDownloader(delay=0.01)
+
+    async def download(song):
+        result = await downloader(song)
+        finished.append(time.monotonic())
+        return result
+
+    manager = await make_manager(
+        max_concurrent=1, progress_callback=callback, progress_interval=0.001
+    )
+    await manager.add_batch([make_song(f"song{i}") for i in range(5)])
+
+    await collect(manager, download)
+
+    assert len(finished) == 5
+    assert max(finished) < callback_ended[0]
+    assert threading.get_ident() not in threads
+
+
+async def test_fast_sync_progress_callback_runs_on_loop():
+    """
+    With sync_callback_is_fast, a sync progress callback is called directly.
+    """
+
+    threads = []
+    manager = await make_manager(
+        progress_callback=lambda song, message: threads.append(threading.get_ident()),
+        sync_callback_is_fast=True,
+    )
+    await manager.add_to_queue(make_song("song"))
+
+    await collect(manager, FakeDownloader())
+
+    assert threads
+    assert set(threads) == {threading.get_ident()}
+
+
+async def test_progress_callback_before_initialize():
+    """
+    Updates flushed before initialize call a sync callback directly.
+    """
+
+    updates = []
+    manager = BatchDownloadManager(
+        progress_callback=lambda song, message: updates.append(
+            (message, threading.get_ident())
+        )
+    )
+
+    manager._notify(make_song("song"), "Queued for download")
+    await manager._flush_updates()
+
+    assert updates == [("Queued for download", threading.get_ident())]
+    manager._update_flusher.cancel()
+
+
+@pytest.mark.parametrize(
+    "exception, expected",
+    [
+        (FakeHTTPError(429, {"Retry-After": "120"}), 120.0),
+        (FakeHTTPError(429, {"Retry-After": "-5"}), 0.0),
+        (FakeHTTPError(429), None),
+        (FakeHTTPError(429, {"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}), None),
+        (FakeHTTPError(503, {"Retry-After": "120"}), None),
+        (RuntimeError("429 Retry-After: 120"), None),
+        (None, None),
+    ],
+)
+def test_get_retry_after(exception, expected):
+    """
+    Retry-After is only read from HTTP 429 errors with a numeric header.
+    """
+
+    assert _get_retry_after(exception) == expected
+
+
+def test_get_retry_after_from_urllib_style_error():
+    """
+    Errors with code and headers attributes, like urllib's HTTPError, work too.
+    """
+
+    error = RuntimeError("Too Many Requests")
+    error.code = 429  # type: ignore
+    error.headers = {"Retry-After": "7"}  # type: ignore
+
+    assert _get_retry_after(error) == 7.0
+
+
+def test_backoff_is_jittered_within_max_backoff():
+    """
+    Backoff doubles per retry up to max_backoff and is jittered below it.
+    """
+
+    manager = BatchDownloadManager(max_retries=8, max_backoff=60)
+
+    assert manager._backoff_table == [1, 2, 4, 8, 16, 32, 60, 60, 60, 60]
+
+    for retry_count, backoff in enumerate(manager._backoff_table):
+        delays = [manager._get_backoff(retry_count) for _ in range(200)]
+        assert all(backoff / 2 <= delay <= backoff for delay in delays)
+        assert len(set(delays)) > 1
+
+
+def test_backoff_honours_retry_after():
+    """
+    Retry-After is used as the minimum delay, even above max_backoff.
+    """
+
+    manager = BatchDownloadManager(max_backoff=60)
+
+    assert manager._get_backoff(1, FakeHTTPError(429, {"Retry-After": "120"})) == 120
+    assert 1 <= manager._get_backoff(1, FakeHTTPError(429)) <= 2
+
+    # A shorter Retry-After doesn't cut the backoff short
+    assert manager._get_backoff(3, FakeHTTPError(429, {"Retry-After": "0"})) >= 4